@@ -1,3 +1,4 @@
+import math
 import matplotlib.pyplot as plt
 
 path = '/Users/crogers/GitHub/ME51-25/PIV/steady_flow/frame_0_delay-0.14s.png'
@@ -35,7 +36,7 @@ def on_click(event):
         x1, y1 = points[0]
         x2, y2 = points[1]
 
-        distance = ((x2-x1)**2 + (y2-y1)**2)**0.5
+        distance = math.hypot(x2-x1, y2-y1)
 
         # Update the text with the calculated distance
         dist_text = ax.text(0, 0, '', color='white', fontsize=12, va='top')
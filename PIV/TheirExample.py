@@ -1,77 +1,279 @@
-from openpiv import tools, validation, filters, scaling, pyprocess
+from openpiv import tools, validation, scaling, pyprocess
 import numpy as np
 import matplotlib.pyplot as plt
-
-#basePath = '/Users/crogers/GitHub/ME51-25/PIV/odd_flow'
-basePath = '/Users/crogers/GitHub/ME51-25/PIV/odd_flow'
-frame_a = tools.imread(basePath+'/frame_0_delay-0.14s.png')
-frame_b = tools.imread(basePath+'/frame_1_delay-0.14s.png')
-
-fig, ax = plt.subplots(1, 2, figsize=(10, 8))
-ax[0].imshow(frame_a, cmap=plt.cm.gray)
-ax[1].imshow(frame_b, cmap=plt.cm.gray)
-
-# Add titles to make it clearer
-ax[0].set_title('Frame A')
-ax[1].set_title('Frame B')
-
-winsize = 32 # pixels, interrogation window size in frame A
-searchsize = 38  # pixels, search area size in frame B
-overlap = 17 # pixels, 50% overlap
-dt = 0.02 # sec, time interval between the two frames
-
-u0, v0, sig2noise = pyprocess.extended_search_area_piv(
-    frame_a.astype(np.int32),
-    frame_b.astype(np.int32),
-    window_size=winsize,
-    overlap=overlap,
-    dt=dt,
-    search_area_size=searchsize,
-    sig2noise_method='peak2peak',
-)
-
-x, y = pyprocess.get_coordinates(
-    image_size=frame_a.shape,
-    search_area_size=searchsize,
-    overlap=overlap,
-)
-
-invalid_mask = validation.sig2noise_val(
-    sig2noise,
-    threshold = 1.05,
-)
-u2, v2 = filters.replace_outliers(
-    u0, v0,
-    invalid_mask,
-    method='localmean',
-    max_iter=3,
-    kernel_size=3,
-)
-
-# convert x,y to mm
-# convert u,v to mm/sec
-
-x, y, u3, v3 = scaling.uniform(
-    x, y, u2, v2,
-    scaling_factor = 96.52,  # 96.52 pixels/millimeter
-)
-
-# 0,0 shall be bottom left, positive rotation rate is counterclockwise
-x, y, u3, v3 = tools.transform_coordinates(x, y, u3, v3)
-
-tools.save(basePath+'/exp1_001.txt' , x, y, u3, v3, invalid_mask)
-
-fig, ax = plt.subplots(figsize=(8,8))
-tools.display_vector_field(
-    basePath+'/exp1_001.txt',
-    ax=ax, scaling_factor=96.52,
-    scale=50, # scale defines here the arrow length
-    width=0.0035, # width is the thickness of the arrow
-    on_img=True, # overlay on the image
-    image_name= basePath+'/frame_0_delay-0.14s.png'
-);
+from scipy import ndimage
+from concurrent.futures import ProcessPoolExecutor
 
 try:
-    plt.show()
-except:
-    pass
+    import torch  # optional: correlates all windows in one batched FFT, on the GPU if there is one
+except ImportError:
+    torch = None
+
+SHOW_PREVIEW = False  # also show the two raw frames side by side (slow for large frames)
+TILE_SIZE = 512  # pixels, frames are split into tiles of about this size when processed in parallel
+TILED_MIN_WINDOWS = 20000  # fewer windows than this are faster in one batched call than with worker processes
+
+def torch_extended_search_area_piv(frame_a, frame_b, window_size, overlap, dt, search_area_size):
+    """
+    Same steps as pyprocess.extended_search_area_piv (circular FFT correlation,
+    sub-pixel peak, peak2peak signal to noise), but every interrogation window is
+    correlated at once with one batched FFT instead of window by window
+    """
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    step = search_area_size - overlap
+    
+    # Cut both frames into overlapping search-area sized windows
+    a = torch.as_tensor(frame_a, dtype=torch.float32, device=device)
+    b = torch.as_tensor(frame_b, dtype=torch.float32, device=device)
+    aa = a.unfold(0, search_area_size, step).unfold(1, search_area_size, step)
+    bb = b.unfold(0, search_area_size, step).unfold(1, search_area_size, step)
+    n_rows, n_cols = aa.shape[:2]
+    aa = aa.reshape(-1, search_area_size, search_area_size)
+    bb = bb.reshape(-1, search_area_size, search_area_size)
+    
+    if search_area_size > window_size:
+        # Normalize like pyprocess.normalize_intensity, then keep only the
+        # central window_size part of each frame A window
+        def normalize(windows):
+            windows = windows - windows.mean(dim=(-2, -1), keepdim=True)
+            std = windows.std(dim=(-2, -1), keepdim=True, unbiased=False)
+            return torch.where(std > 0, windows / std, torch.zeros_like(windows))
+        aa = normalize(aa)
+        bb = normalize(bb)
+        pad = (search_area_size - window_size) // 2
+        mask = torch.zeros(search_area_size, search_area_size, device=device)
+        mask[pad:search_area_size - pad, pad:search_area_size - pad] = 1
+        aa = aa * mask
+    
+    # Circular cross-correlation of every window pair in one batched FFT
+    corr = torch.fft.irfft2(torch.fft.rfft2(aa).conj() * torch.fft.rfft2(bb), s=aa.shape[-2:])
+    corr = torch.fft.fftshift(corr, dim=(-2, -1)).cpu().numpy()
+    
+    # Peaks and signal to noise on the host, with the same code and openpiv checks as the CPU path
+    u, v = peak_displacements(corr, n_rows, n_cols)
+    sig2noise = pyprocess.sig2noise_ratio(corr, sig2noise_method='peak2peak').reshape(n_rows, n_cols)
+    
+    return u / dt, v / dt, sig2noise
+
+def peak_displacements(corr, n_rows, n_cols):
+    """
+    Sub-pixel position of the highest peak of every correlation map, relative to the
+    map center, as pyprocess.find_subpixel_peak_position finds it one map at a time:
+    3-point gaussian fit, or parabolic where one of the five points is negative
+    """
+    n, h, w = corr.shape
+    
+    # Integer location of the highest peak in each correlation map
+    row, col = np.divmod(corr.reshape(n, -1).argmax(axis=1), w)
+    
+    # Peaks on the edge of the map stay on the integer pixel
+    k = np.arange(n)
+    r, c = np.clip(row, 1, h - 2), np.clip(col, 1, w - 2)
+    inside = (row == r) & (col == c)
+    center = corr[k, r, c]
+    up, down = corr[k, r - 1, c], corr[k, r + 1, c]
+    left, right = corr[k, r, c - 1], corr[k, r, c + 1]
+    gaussian = np.min([center, up, down, left, right], axis=0) >= 0
+    
+    log = lambda a: np.log(np.maximum(a, 1e-7))
+    def fit(lower, peak, upper):
+        return np.where(gaussian,
+                        (log(lower) - log(upper)) / (2*log(lower) - 4*log(peak) + 2*log(upper)),
+                        (lower - upper) / (2*lower - 4*peak + 2*upper))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        row_sub = row + np.where(inside, np.nan_to_num(fit(up, center, down)), 0)
+        col_sub = col + np.where(inside, np.nan_to_num(fit(left, center, right)), 0)
+    
+    # Displacement from the center of the correlation map, as in pyprocess.correlation_to_displacement
+    u = (col_sub - w // 2).reshape(n_rows, n_cols)
+    v = (row_sub - h // 2).reshape(n_rows, n_cols)
+    return u, v
+
+def batched_extended_search_area_piv(frame_a, frame_b, window_size, overlap, dt, search_area_size):
+    """
+    CPU version of the same batched pipeline, built from openpiv's own pieces:
+    stack all windows with moving_window_array, correlate them with one batched
+    FFT and locate every correlation peak at once instead of window by window
+    """
+    n_rows, n_cols = pyprocess.get_field_shape(frame_a.shape, search_area_size, overlap)
+    aa = pyprocess.moving_window_array(frame_a, search_area_size, overlap)
+    bb = pyprocess.moving_window_array(frame_b, search_area_size, overlap)
+    
+    if search_area_size > window_size:
+        # Only the central window_size part of each frame A window takes part
+        aa = pyprocess.normalize_intensity(aa)
+        bb = pyprocess.normalize_intensity(bb)
+        pad = (search_area_size - window_size) // 2
+        mask = np.zeros((search_area_size, search_area_size), dtype=aa.dtype)
+        mask[pad:search_area_size - pad, pad:search_area_size - pad] = 1
+        aa = aa * mask
+    
+    corr = pyprocess.fft_correlate_images(aa, bb, correlation_method='circular', normalized_correlation=False)
+    u, v = peak_displacements(corr, n_rows, n_cols)
+    sig2noise = pyprocess.sig2noise_ratio(corr, sig2noise_method='peak2peak').reshape(n_rows, n_cols)
+    
+    return u / dt, v / dt, sig2noise
+
+def _piv_tile(job):
+    """Worker process: correlate one tile of both frames"""
+    tile_a, tile_b, window_size, overlap, dt, search_area_size = job
+    return batched_extended_search_area_piv(tile_a, tile_b, window_size, overlap, dt, search_area_size)
+
+def tiled_extended_search_area_piv(frame_a, frame_b, window_size, overlap, dt, search_area_size, tile_size=TILE_SIZE):
+    """
+    Split the frames into near-square tiles lined up with the interrogation window
+    grid, correlate the tiles in parallel processes and stitch the vector fields.
+    Neighboring tiles share `overlap` pixels, so every window lands in exactly one tile.
+    """
+    step = search_area_size - overlap
+    n_rows, n_cols = pyprocess.get_field_shape(frame_a.shape, search_area_size, overlap)
+    per_tile = max(1, (tile_size - search_area_size) // step + 1)  # windows along each side of a tile
+    
+    blocks = [(i0, min(i0 + per_tile, n_rows), j0, min(j0 + per_tile, n_cols))
+              for i0 in range(0, n_rows, per_tile) for j0 in range(0, n_cols, per_tile)]
+    jobs = []
+    for i0, i1, j0, j1 in blocks:
+        rows = slice(i0 * step, (i1 - 1) * step + search_area_size)
+        cols = slice(j0 * step, (j1 - 1) * step + search_area_size)
+        jobs.append((frame_a[rows, cols], frame_b[rows, cols], window_size, overlap, dt, search_area_size))
+    
+    with ProcessPoolExecutor() as pool:
+        results = pool.map(_piv_tile, jobs)
+        
+        u = np.empty((n_rows, n_cols))
+        v = np.empty((n_rows, n_cols))
+        sig2noise = np.empty((n_rows, n_cols))
+        for (i0, i1, j0, j1), (u_tile, v_tile, sig2noise_tile) in zip(blocks, results):
+            u[i0:i1, j0:j1] = u_tile
+            v[i0:i1, j0:j1] = v_tile
+            sig2noise[i0:i1, j0:j1] = sig2noise_tile
+    
+    return u, v, sig2noise
+
+def replace_outliers_localmean(u, v, invalid_mask, max_iter=3, kernel_size=1):
+    """
+    Same job as filters.replace_outliers(method='localmean'): every invalid vector
+    becomes the mean of the valid vectors in the (2*kernel_size+1)^2 neighborhood
+    around it, repeated max_iter times so larger holes fill in from their edges.
+    Each pass is a few whole-field convolutions instead of a loop over the invalid vectors.
+    """
+    kernel = np.ones((2*kernel_size + 1, 2*kernel_size + 1))
+    kernel[kernel_size, kernel_size] = 0  # neighbors only
+    invalid = invalid_mask.astype(bool)
+    known = ~invalid
+    u = np.where(known, u, 0.0)
+    v = np.where(known, v, 0.0)
+    
+    for _ in range(max_iter):
+        # Number of known neighbors, and the local means over those neighbors
+        count = ndimage.convolve(known.astype(float), kernel, mode='constant')
+        fill = invalid & (count > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            u = np.where(fill, ndimage.convolve(u, kernel, mode='constant') / count, u)
+            v = np.where(fill, ndimage.convolve(v, kernel, mode='constant') / count, v)
+        known = known | fill
+    
+    # Vectors with no valid neighbors within reach stay missing, as in openpiv
+    return np.where(known, u, np.nan), np.where(known, v, np.nan)
+
+if __name__ == '__main__':  # worker processes import this file without rerunning the example
+    #basePath = '/Users/crogers/GitHub/ME51-25/PIV/odd_flow'
+    basePath = '/Users/crogers/GitHub/ME51-25/PIV/odd_flow'
+    frame_a = tools.imread(basePath+'/frame_0_delay-0.14s.png')
+    frame_b = tools.imread(basePath+'/frame_1_delay-0.14s.png')
+
+    # Single precision halves the memory of the frames and the stacked windows. The torch path
+    # correlates in float32 too, but openpiv's normalize_intensity returns float64, so the CPU
+    # path's FFTs run in double precision
+    frame_a = frame_a.astype(np.float32)
+    frame_b = frame_b.astype(np.float32)
+
+    winsize = 32 # pixels, interrogation window size in frame A
+    searchsize = 38  # pixels, search area size in frame B
+    overlap = 17 # pixels, 50% overlap
+    dt = 0.02 # sec, time interval between the two frames
+
+    if torch is not None:
+        u0, v0, sig2noise = torch_extended_search_area_piv(
+            frame_a,
+            frame_b,
+            window_size=winsize,
+            overlap=overlap,
+            dt=dt,
+            search_area_size=searchsize,
+        )
+    elif np.prod(pyprocess.get_field_shape(frame_a.shape, searchsize, overlap)) >= TILED_MIN_WINDOWS:
+        u0, v0, sig2noise = tiled_extended_search_area_piv(
+            frame_a,
+            frame_b,
+            window_size=winsize,
+            overlap=overlap,
+            dt=dt,
+            search_area_size=searchsize,
+        )
+    else:
+        u0, v0, sig2noise = batched_extended_search_area_piv(
+            frame_a,
+            frame_b,
+            window_size=winsize,
+            overlap=overlap,
+            dt=dt,
+            search_area_size=searchsize,
+        )
+
+    if SHOW_PREVIEW:
+        fig, ax = plt.subplots(1, 2, figsize=(10, 8))
+        ax[0].imshow(frame_a, cmap=plt.cm.gray)
+        ax[1].imshow(frame_b, cmap=plt.cm.gray)
+
+        # Add titles to make it clearer
+        ax[0].set_title('Frame A')
+        ax[1].set_title('Frame B')
+
+    x, y = pyprocess.get_coordinates(
+        image_size=frame_a.shape,
+        search_area_size=searchsize,
+        overlap=overlap,
+    )
+
+    invalid_mask = validation.sig2noise_val(
+        sig2noise,
+        threshold = 1.05,
+    )
+    u2, v2 = replace_outliers_localmean(
+        u0, v0,
+        invalid_mask,
+        max_iter=3,
+        kernel_size=3,
+    )
+
+    # convert x,y to mm
+    # convert u,v to mm/sec
+
+    x, y, u3, v3 = scaling.uniform(
+        x, y, u2, v2,
+        scaling_factor = 96.52,  # 96.52 pixels/millimeter
+    )
+
+    # 0,0 shall be bottom left, positive rotation rate is counterclockwise
+    x, y, u3, v3 = tools.transform_coordinates(x, y, u3, v3)
+
+    tools.save(basePath+'/exp1_001.txt' , x, y, u3, v3, invalid_mask)
+
+    # Draw the vectors straight from the arrays instead of reading exp1_001.txt back in
+    fig, ax = plt.subplots(figsize=(8,8))
+    # overlay on the negative image (dark particles), stretched over the vector field in mm
+    xmax = np.amax(x) + winsize / (2 * 96.52)
+    ymax = np.amax(y) + winsize / (2 * 96.52)
+    ax.imshow(tools.negative(frame_a), cmap='Greys_r', extent=[0.0, xmax, 0.0, ymax])
+    invalid = invalid_mask.astype(bool)
+    # replaced outliers in red, valid vectors in blue
+    # scale defines here the arrow length, width is the thickness of the arrow
+    ax.quiver(x[invalid], y[invalid], u3[invalid], v3[invalid], color='r', scale=50, width=0.0035)
+    ax.quiver(x[~invalid], y[~invalid], u3[~invalid], v3[~invalid], color='b', scale=50, width=0.0035)
+    ax.set_aspect(1.)
+
+    try:
+        plt.show()
+    except:
+        pass
@@ -1,29 +1,87 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider
+from numba import njit, prange
+from scipy.sparse import diags
+from scipy.sparse.linalg import splu
 
-def solve_stream_function_with_circle(nx, ny, circle_radius=0.2, U_inf=1.0):
+# Parameters
+nx, ny = 101, 101  # Higher grid resolution for better circle resolution
+U_inf = 1.0        # Free stream velocity
+initial_radius = 0.2  # Initial circle radius
+
+# Grid spacing
+dx = 2.0 / (nx - 1)  # Domain from -1 to 1
+dy = 2.0 / (ny - 1)  # Domain from -1 to 1
+
+# Create coordinate arrays once; only the circle radius changes between solves
+x = np.linspace(-1, 1, nx)
+y = np.linspace(-1, 1, ny)
+X, Y = np.meshgrid(x, y)
+
+# Circular obstacle at center (0, 0)
+circle_center_x, circle_center_y = 0.0, 0.0
+distance_from_center = np.hypot(X - circle_center_x, Y - circle_center_y)
+
+# Points of one color only read neighbors of the other color, so rows run in parallel
+@njit('f8(f8[:, ::1], b1[:, ::1], f8)', parallel=True, fastmath=True, cache=True)
+def _sor_sweep(psi, mask, omega):
+    """
+    One red-black SOR iteration of ∇²ψ = 0, in place; masked points are skipped.
+    Returns the largest change made to psi.
+    """
+    ny, nx = psi.shape
+    row_change = np.zeros(ny)
+    for color in range(2):
+        for i in prange(1, ny-1):
+            largest = row_change[i]
+            for j in range(1 + (i + 1 + color) % 2, nx-1, 2):
+                if not mask[i, j]:
+                    psi_gs = 0.25 * (psi[i+1, j] + psi[i-1, j] + psi[i, j+1] + psi[i, j-1])
+                    change = omega * (psi_gs - psi[i, j])
+                    psi[i, j] += change
+                    largest = max(largest, abs(change))
+            row_change[i] = largest
+    return row_change.max()
+
+# Sparse LU factorization of the last direct solve and the fixed points it was built for
+lu = None
+lu_fixed = None
+
+def solve_laplace_direct(psi, fixed):
+    """
+    Solve ∇²ψ = 0 with a sparse LU factorization of the 5-point Laplacian.
+    fixed: True where psi keeps its current value (walls, inlet/outlet, obstacles)
+    """
+    global lu, lu_fixed
+    ny, nx = psi.shape
+    
+    # The matrix only depends on which points are fixed, so it is only factored when they change
+    if lu_fixed is None or not np.array_equal(fixed, lu_fixed):
+        n = nx * ny
+        fixed_flat = fixed.ravel()
+        # 5-point Laplacian on square cells (dx == dy), with the rows of fixed points
+        # replaced by identity rows so they keep their boundary value
+        laplacian = diags([1, 1, -4, 1, 1], [-nx, -1, 0, 1, nx], shape=(n, n), format='csr')
+        A = diags((~fixed_flat).astype(float)) @ laplacian + diags(fixed_flat.astype(float))
+        lu = splu(A.tocsc())
+        lu_fixed = fixed.copy()
+    
+    rhs = np.where(fixed, psi, 0.0).ravel()
+    return lu.solve(rhs).reshape(ny, nx)
+
+def solve_stream_function_with_circle(circle_radius=0.2, U_inf=1.0, method='direct', psi0=None):
     """
     Solve for stream function with a circular obstacle in the center.
     circle_radius: radius of the circular obstacle
+    method: 'direct' (sparse LU, refactored only when the obstacle covers other grid points)
+            or 'sor' (iterative red-black SOR)
+    psi0: previous solution to start the SOR iteration from (warm start), or None to start from zero
     """
-    # Grid spacing
-    dx = 2.0 / (nx - 1)  # Domain from -1 to 1
-    dy = 2.0 / (ny - 1)  # Domain from -1 to 1
-    
-    # Create coordinate arrays
-    x = np.linspace(-1, 1, nx)
-    y = np.linspace(-1, 1, ny)
-    X, Y = np.meshgrid(x, y)
-    
-    # Initialize stream function
-    psi = np.zeros((ny, nx))
-    
-    # Create circular obstacle at center (0, 0)
-    circle_center_x, circle_center_y = 0.0, 0.0
+    # Initialize stream function; a nearby previous solution converges in far fewer sweeps
+    psi = np.zeros((ny, nx)) if psi0 is None else psi0.copy()
     
     # Create mask for circular obstacle
-    distance_from_center = np.sqrt((X - circle_center_x)**2 + (Y - circle_center_y)**2)
     circle_mask = distance_from_center <= circle_radius
     
     # Set boundary conditions for domain [-1, 1] x [-1, 1]
@@ -44,15 +102,21 @@ def solve_stream_function_with_circle(nx, ny, circle_radius=0.2, U_inf=1.0):
     # We'll use ψ = 0 on the circle surface (streamline that splits around the circle)
     psi[circle_mask] = 0.0
     
+    if method == 'direct':
+        # Domain edges and the solid region keep the values set above
+        fixed = circle_mask.copy()
+        fixed[[0, -1], :] = True
+        fixed[:, [0, -1]] = True
+        psi = solve_laplace_direct(psi, fixed)
+        return psi, circle_mask
+    
     # Solve Laplace equation ∇²ψ = 0 in the fluid region
+    omega = 2.0 / (1.0 + np.sin(np.pi / max(nx, ny)))  # Optimal over-relaxation for this grid
     for iteration in range(2000):  # More iterations for convergence with circle
-        psi_old = psi.copy()
-        
-        # Interior points: ∇²ψ = 0
-        for i in range(1, ny-1):
-            for j in range(1, nx-1):
-                if not circle_mask[i, j]:  # Only update fluid points
-                    psi[i, j] = 0.25 * (psi[i+1, j] + psi[i-1, j] + psi[i, j+1] + psi[i, j-1])
+        # Interior points: ∇²ψ = 0 (only fluid points are updated)
+        # Red points first, then black points using the freshly updated red values;
+        # the sweep reports its largest update, so no copy of the previous iterate is kept
+        change = _sor_sweep(psi, circle_mask, omega)
         
         # Reapply boundary conditions
         psi[:, 0] = U_inf * y    # Left
@@ -60,35 +124,26 @@ def solve_stream_function_with_circle(nx, ny, circle_radius=0.2, U_inf=1.0):
         psi[0, :] = -U_inf       # Bottom
         psi[-1, :] = U_inf       # Top
         
-        # Circular obstacle - constant stream function
-        psi[circle_mask] = 0.0
+        # The circle stays at ψ = 0: the sweep never writes masked points
         
         # Check convergence
-        if np.max(np.abs(psi - psi_old)) < 1e-6:
+        if change < 1e-6:
             print(f"Converged after {iteration+1} iterations")
             break
     
-    return X, Y, psi, circle_mask
+    return psi, circle_mask
 
 def compute_laplacian(psi, dx, dy):
     """Compute the Laplacian of the stream function using finite differences"""
-    ny, nx = psi.shape
     laplacian = np.zeros_like(psi)
     
-    # Interior points
-    for i in range(1, ny-1):
-        for j in range(1, nx-1):
-            d2psi_dx2 = (psi[i, j+1] - 2*psi[i, j] + psi[i, j-1]) / dx**2
-            d2psi_dy2 = (psi[i+1, j] - 2*psi[i, j] + psi[i-1, j]) / dy**2
-            laplacian[i, j] = d2psi_dx2 + d2psi_dy2
+    # Interior points (boundary rows/columns stay zero)
+    d2psi_dx2 = (psi[1:-1, 2:] - 2*psi[1:-1, 1:-1] + psi[1:-1, :-2]) / dx**2
+    d2psi_dy2 = (psi[2:, 1:-1] - 2*psi[1:-1, 1:-1] + psi[:-2, 1:-1]) / dy**2
+    laplacian[1:-1, 1:-1] = d2psi_dx2 + d2psi_dy2
     
     return laplacian
 
-# Parameters
-nx, ny = 101, 101  # Higher grid resolution for better circle resolution
-U_inf = 1.0        # Free stream velocity
-initial_radius = 0.2  # Initial circle radius
-
 # Create the figure and subplots
 fig = plt.figure(figsize=(18, 10))
 gs = fig.add_gridspec(2, 3, height_ratios=[1, 0.05], hspace=0.3, wspace=0.3)
@@ -102,21 +157,56 @@ ax3 = fig.add_subplot(gs[0, 2])
 slider_ax = fig.add_subplot(gs[1, :])
 
 # Solve initial case
-X, Y, psi_initial, circle_mask_initial = solve_stream_function_with_circle(nx, ny, initial_radius, U_inf)
-
-# Compute grid spacing
-dx = 2.0 / (nx - 1)
-dy = 2.0 / (ny - 1)
+psi_initial, circle_mask_initial = solve_stream_function_with_circle(initial_radius, U_inf)
 
 # Compute initial Laplacian
 laplacian_initial = compute_laplacian(psi_initial, dx, dy)
 
+# Plot decorations that never change are set up once
+for ax in (ax1, ax2, ax3):
+    ax.set_xlabel('x')
+    ax.set_ylabel('y')
+    ax.grid(True, alpha=0.3)
+    ax.axis('equal')
+    ax.set_xlim(-1, 1)
+    ax.set_ylim(-1, 1)
+ax2.set_title('Laplacian of Stream Function (∇²ψ)')
+ax3.set_title('Velocity Field and Streamlines')
+
+# Add flow direction arrows
+flow_label = ax1.annotate('Flow →', xy=(-0.8, 0.7), fontsize=12, 
+                          bbox=dict(boxstyle="round", facecolor='lightblue', alpha=0.8))
+
+# Circle boundaries; only their radius changes
+circle1 = plt.Circle((0, 0), initial_radius, fill=True, color='gray', alpha=0.8)
+circle2 = plt.Circle((0, 0), initial_radius, fill=True, color='gray', alpha=0.8)
+circle3 = plt.Circle((0, 0), initial_radius, fill=True, color='gray', alpha=0.8, edgecolor='black', linewidth=2)
+ax1.add_patch(circle1)
+ax2.add_patch(circle2)
+ax3.add_patch(circle3)
+
+# Quiver on the whole subsampled grid; arrows inside the circle are masked out
+step = 6
+sub_idx = (slice(None, None, step), slice(None, None, step))
+X_sub = X[sub_idx]
+Y_sub = Y[sub_idx]
+quiver = ax3.quiver(X_sub, Y_sub, np.zeros_like(X_sub), np.zeros_like(Y_sub), np.zeros_like(X_sub),
+                    cmap='viridis', alpha=0.8)
+
+# Everything that changes with the radius is animated: it is left out of normal
+# figure draws and blitted over a cached background of the static parts instead
+contour_sets = []
+dynamic_artists = []
+cb2 = None
+background = None
+
 # Initial plots
 def create_plots(psi, laplacian, circle_mask, radius):
-    # Clear all axes
-    ax1.clear()
-    ax2.clear()
-    ax3.clear()
+    global cb2
+    
+    # Contour sets can't be updated in place, so the previous ones are replaced
+    for contour_set in contour_sets:
+        contour_set.remove()
     
     # Plot 1: Stream function
     # Mask solid regions
@@ -124,23 +214,9 @@ def create_plots(psi, laplacian, circle_mask, radius):
     psi_plot[circle_mask] = np.nan
     
     contour1 = ax1.contour(X, Y, psi_plot, levels=25, colors='blue', alpha=0.8)
-    ax1.clabel(contour1, inline=True, fontsize=8)
-    
-    # Draw circle boundary
-    circle = plt.Circle((0, 0), radius, fill=True, color='gray', alpha=0.8)
-    ax1.add_patch(circle)
-    
+    labels1 = ax1.clabel(contour1, inline=True, fontsize=8)
+    circle1.set_radius(radius)
     ax1.set_title(f'Stream Function ψ (Circle Radius: {radius:.2f})')
-    ax1.set_xlabel('x')
-    ax1.set_ylabel('y')
-    ax1.grid(True, alpha=0.3)
-    ax1.axis('equal')
-    ax1.set_xlim(-1, 1)
-    ax1.set_ylim(-1, 1)
-    
-    # Add flow direction arrows
-    ax1.annotate('Flow →', xy=(-0.8, 0.7), fontsize=12, 
-                bbox=dict(boxstyle="round", facecolor='lightblue', alpha=0.8))
     
     # Plot 2: Laplacian
     laplacian_plot = laplacian.copy()
@@ -152,83 +228,77 @@ def create_plots(psi, laplacian, circle_mask, radius):
     
     contour2 = ax2.contourf(X, Y, laplacian_plot, levels=20, cmap='RdBu_r', 
                            vmin=-vmax, vmax=vmax)
-    cb2 = plt.colorbar(contour2, ax=ax2, label='∇²ψ')
+    if cb2 is None:
+        cb2 = plt.colorbar(contour2, ax=ax2, label='∇²ψ')
+    else:
+        # update_normal keeps the first contour set's level bands, so hand it the new ones
+        cb2.boundaries = contour2.levels
+        cb2.values = contour2.cvalues
+        cb2.update_normal(contour2)
     contour2_lines = ax2.contour(X, Y, laplacian_plot, levels=20, colors='black', 
                                 alpha=0.4, linewidths=0.5)
-    
-    # Draw circle boundary
-    circle2 = plt.Circle((0, 0), radius, fill=True, color='gray', alpha=0.8)
-    ax2.add_patch(circle2)
-    
-    ax2.set_title('Laplacian of Stream Function (∇²ψ)')
-    ax2.set_xlabel('x')
-    ax2.set_ylabel('y')
-    ax2.grid(True, alpha=0.3)
-    ax2.axis('equal')
-    ax2.set_xlim(-1, 1)
-    ax2.set_ylim(-1, 1)
+    circle2.set_radius(radius)
     
     # Plot 3: Velocity field
-    u = np.gradient(psi, dy, axis=0)  # ∂ψ/∂y
-    v = -np.gradient(psi, dx, axis=1)  # -∂ψ/∂x
-    
-    # Mask solid regions for velocity
-    u[circle_mask] = 0
-    v[circle_mask] = 0
-    
-    # Subsample for quiver plot
-    step = 6
-    X_sub = X[::step, ::step]
-    Y_sub = Y[::step, ::step]
-    u_sub = u[::step, ::step]
-    v_sub = v[::step, ::step]
-    circle_sub = circle_mask[::step, ::step]
+    # Subsample for quiver plot; solid points are masked out below rather than zeroed
+    u_sub = np.gradient(psi, dy, axis=0)[sub_idx]  # ∂ψ/∂y
+    v_sub = -np.gradient(psi, dx, axis=1)[sub_idx]  # -∂ψ/∂x
+    circle_sub = circle_mask[sub_idx]
     
     # Only plot arrows in fluid regions
-    X_fluid = X_sub[~circle_sub]
-    Y_fluid = Y_sub[~circle_sub]
-    u_fluid = u_sub[~circle_sub]
-    v_fluid = v_sub[~circle_sub]
-    
-    if len(X_fluid) > 0:
-        speed = np.sqrt(u_fluid**2 + v_fluid**2)
-        ax3.quiver(X_fluid, Y_fluid, u_fluid, v_fluid, speed, 
-                  cmap='viridis', alpha=0.8)
+    u_fluid = np.ma.masked_array(u_sub, circle_sub)
+    v_fluid = np.ma.masked_array(v_sub, circle_sub)
+    speed = np.hypot(u_fluid, v_fluid)
+    quiver.set_UVC(u_fluid, v_fluid, speed)
+    quiver.scale = None  # rescale the arrow length to the new speeds, as a new quiver would
+    quiver.autoscale()
     
     # Add streamlines
     contour3 = ax3.contour(X, Y, psi_plot, levels=20, colors='blue', alpha=0.5, linewidths=1)
-    
-    # Draw circle boundary
-    circle3 = plt.Circle((0, 0), radius, fill=True, color='gray', alpha=0.8, edgecolor='black', linewidth=2)
-    ax3.add_patch(circle3)
-    
-    ax3.set_title('Velocity Field and Streamlines')
-    ax3.set_xlabel('x')
-    ax3.set_ylabel('y')
-    ax3.grid(True, alpha=0.3)
-    ax3.axis('equal')
-    ax3.set_xlim(-1, 1)
-    ax3.set_ylim(-1, 1)
+    circle3.set_radius(radius)
+    
+    contour_sets[:] = [contour1, contour2, contour2_lines, contour3]
+    dynamic_artists[:] = [contour1, *labels1, circle1, flow_label, ax1.title,
+                          contour2, contour2_lines, circle2, cb2.ax,
+                          quiver, contour3, circle3, slider_ax]
+    for artist in dynamic_artists:
+        artist.set_animated(True)
+
+def draw_dynamic_artists():
+    """Draw the animated artists, back to front, onto the canvas"""
+    for artist in dynamic_artists:
+        fig.draw_artist(artist)
+
+def on_draw(event):
+    """After a full redraw (first show, resize) cache the static background"""
+    global background
+    background = fig.canvas.copy_from_bbox(fig.bbox)
+    draw_dynamic_artists()
+
+fig.canvas.mpl_connect('draw_event', on_draw)
 
 # Create initial plots
 create_plots(psi_initial, laplacian_initial, circle_mask_initial, initial_radius)
 
-# Create slider
+# Create slider; it is blitted with the plots instead of triggering full redraws
 slider = Slider(slider_ax, 'Circle Radius', 0.05, 0.8, valinit=initial_radius, valfmt='%.2f')
+slider.drawon = False
 
 # Update function
 def update(val):
     radius = slider.val
     
-    # Solve with new circle radius
-    X_new, Y_new, psi_new, circle_mask_new = solve_stream_function_with_circle(nx, ny, radius, U_inf)
+    # Solve with new circle radius; the LU factorization is reused while the solid points stay the same
+    psi_new, circle_mask_new = solve_stream_function_with_circle(radius, U_inf)
     laplacian_new = compute_laplacian(psi_new, dx, dy)
     
     # Update plots
     create_plots(psi_new, laplacian_new, circle_mask_new, radius)
     
-    # Redraw
-    fig.canvas.draw()
+    # Redraw only what changed, on top of the cached background
+    fig.canvas.restore_region(background)
+    draw_dynamic_artists()
+    fig.canvas.blit(fig.bbox)
 
 # Connect slider to update function
 slider.on_changed(update)
@@ -1,10 +1,36 @@
 import numpy as np
 import matplotlib.pyplot as plt
-from scipy.sparse import diags
-from scipy.sparse.linalg import spsolve
-import scipy.ndimage as ndimage
+from scipy.fft import dstn, idstn
 
-def solve_stream_function(nx, ny, U_inf=1.0):
+# Parameters
+nx, ny = 61, 61  # Grid size
+U_inf = 1.0      # Free stream velocity
+
+# Grid spacing
+dx = 2.0 / (nx - 1)  # Domain from -1 to 1
+dy = 2.0 / (ny - 1)  # Domain from -1 to 1
+
+# Create coordinate arrays
+x = np.linspace(0, 2, nx)
+y = np.linspace(0, 2, ny)
+X, Y = np.meshgrid(x, y)
+
+def solve_poisson_dst(rhs, dx, dy):
+    """
+    Solve ∇²φ = rhs on the interior points of a rectangle with φ = 0 on the boundary.
+    Sine modes are eigenvectors of the 5-point Laplacian, so two type-I discrete
+    sine transforms give the exact discrete solution without iterating.
+    """
+    my, mx = rhs.shape
+    
+    # Eigenvalues of the discrete Laplacian for each sine mode
+    lambda_x = 2.0 / dx**2 * (np.cos(np.pi * np.arange(1, mx + 1) / (mx + 1)) - 1)
+    lambda_y = 2.0 / dy**2 * (np.cos(np.pi * np.arange(1, my + 1) / (my + 1)) - 1)
+    eigenvalues = lambda_y[:, None] + lambda_x[None, :]
+    
+    return idstn(dstn(rhs, type=1) / eigenvalues, type=1)
+
+def solve_stream_function(U_inf=1.0):
     """
     Solve for stream function with boundary conditions:
     - Left boundary (inlet): ψ = U_inf * y (free stream)
@@ -12,15 +38,6 @@ def solve_stream_function(nx, ny, U_inf=1.0):
     - Top wall: ψ = constant (no flow through wall)
     - Bottom wall: ψ = 0 (no flow through wall)
     """
-    # Grid spacing
-    dx = 2.0 / (nx - 1)  # Domain from -1 to 1
-    dy = 2.0 / (ny - 1)  # Domain from -1 to 1
-    
-    # Create coordinate arrays
-    x = np.linspace(0, 2, nx)
-    y = np.linspace(0, 2, ny)
-    X, Y = np.meshgrid(x, y)
-    
     # Initialize stream function
     psi = np.zeros((ny, nx))
     
@@ -38,53 +55,27 @@ def solve_stream_function(nx, ny, U_inf=1.0):
     psi[-1, :] = U_inf * 2
     
     # Solve Laplace equation ∇²ψ = 0 in the interior using finite differences
-    # This is a simplified approach - for more accuracy, use iterative methods
-    for iteration in range(5000):  # Simple Gauss-Seidel iteration
-        psi_old = psi.copy()
-        
-        # Interior points: ∇²ψ = 0 discretized as:
-        # (ψ[i+1,j] + ψ[i-1,j] - 2ψ[i,j])/dx² + (ψ[i,j+1] + ψ[i,j-1] - 2ψ[i,j])/dy² = 0
-        for i in range(1, ny-1):
-            for j in range(1, nx-1):
-                psi[i, j] = 0.25 * (psi[i+1, j] + psi[i-1, j] + psi[i, j+1] + psi[i, j-1])
-        
-        # Reapply boundary conditions
-        psi[:, 0] = U_inf * y    # Left
-        psi[:, -1] = U_inf * y   # Right  
-        psi[0, :] = 0            # Bottom
-        psi[-1, :] = U_inf * 2   # Top
-        
-        # Check convergence
-        if np.max(np.abs(psi - psi_old)) < 1e-6:
-            print(f"Converged after {iteration+1} iterations")
-            break
+    # Split ψ = ψ_lift + φ, where the lift ψ_lift = U_inf * y matches every boundary
+    # condition above; φ is then zero on the boundary and solves ∇²φ = -∇²ψ_lift
+    psi_lift = U_inf * Y
+    rhs = -compute_laplacian(psi_lift, dx, dy)[1:-1, 1:-1]
+    psi[1:-1, 1:-1] = psi_lift[1:-1, 1:-1] + solve_poisson_dst(rhs, dx, dy)
     
-    return X, Y, psi
+    return psi
 
 def compute_laplacian(psi, dx, dy):
     """Compute the Laplacian of the stream function using finite differences"""
-    ny, nx = psi.shape
     laplacian = np.zeros_like(psi)
     
-    # Interior points
-    for i in range(1, ny-1):
-        for j in range(1, nx-1):
-            d2psi_dx2 = (psi[i, j+1] - 2*psi[i, j] + psi[i, j-1]) / dx**2
-            d2psi_dy2 = (psi[i+1, j] - 2*psi[i, j] + psi[i-1, j]) / dy**2
-            laplacian[i, j] = d2psi_dx2 + d2psi_dy2
+    # Interior points (boundary rows/columns stay zero)
+    d2psi_dx2 = (psi[1:-1, 2:] - 2*psi[1:-1, 1:-1] + psi[1:-1, :-2]) / dx**2
+    d2psi_dy2 = (psi[2:, 1:-1] - 2*psi[1:-1, 1:-1] + psi[:-2, 1:-1]) / dy**2
+    laplacian[1:-1, 1:-1] = d2psi_dx2 + d2psi_dy2
     
     return laplacian
 
-# Parameters
-nx, ny = 61, 61  # Grid size
-U_inf = 1.0      # Free stream velocity
-
 # Solve for stream function
-X, Y, psi = solve_stream_function(nx, ny, U_inf)
-
-# Compute grid spacing
-dx = 2.0 / (nx - 1)
-dy = 2.0 / (ny - 1)
+psi = solve_stream_function(U_inf)
 
 # Compute Laplacian
 laplacian_psi = compute_laplacian(psi, dx, dy)
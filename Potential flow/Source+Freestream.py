@@ -7,11 +7,14 @@ x = np.linspace(-5, 5, 100)
 y = np.linspace(-5, 5, 100)
 X, Y = np.meshgrid(x, y)
 
+# Polar angle of every grid point; the grid never changes, so compute it once
+THETA = np.arctan2(Y, X)
+
 # Initial coefficient value
 initial_coeff = 1.0
 
 # Calculate initial function z = coeff * y + atan2(x, y)
-Z_initial = initial_coeff * Y + np.arctan2(Y, X)
+Z_initial = initial_coeff * Y + THETA
 
 # Create the figure and axis
 fig, ax = plt.subplots(figsize=(12, 9))
@@ -44,7 +47,7 @@ def update(val):
     c2 = slider2.val
     
     # Calculate new Z values
-    Z_new = coeff * Y + c2/2/3.14*np.arctan2(Y, X)
+    Z_new = coeff * Y + c2 / (2 * np.pi) * THETA
     
     # Clear the current contour plots
     ax.clear()
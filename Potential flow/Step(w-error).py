@@ -1,26 +1,84 @@
 import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.widgets import Slider
+from numba import njit, prange
+from scipy.sparse import diags
+from scipy.sparse.linalg import splu
 
-def solve_stream_function_with_step(nx, ny, step_height=0.0, U_inf=1.0):
+# Parameters
+nx, ny = 81, 81  # Grid size
+U_inf = 1.0      # Free stream velocity
+initial_step = 0.0  # Initial step height
+
+# Grid spacing
+dx = 2.0 / (nx - 1)  # Domain from -1 to 1
+dy = 2.0 / (ny - 1)  # Domain from -1 to 1
+
+# Create coordinate arrays once; only the step height changes between solves
+x = np.linspace(-1, 1, nx)
+y = np.linspace(-1, 1, ny)
+X, Y = np.meshgrid(x, y)
+
+# Step geometry - step starts at x = 0
+step_start_idx = nx // 2  # Middle of domain (x = 0)
+
+# Points of one color only read neighbors of the other color, so rows run in parallel
+@njit('f8(f8[:, ::1], b1[:, ::1], f8)', parallel=True, fastmath=True, cache=True)
+def _sor_sweep(psi, mask, omega):
+    """
+    One red-black SOR iteration of ∇²ψ = 0, in place; masked points are skipped.
+    Returns the largest change made to psi.
+    """
+    ny, nx = psi.shape
+    row_change = np.zeros(ny)
+    for color in range(2):
+        for i in prange(1, ny-1):
+            largest = row_change[i]
+            for j in range(1 + (i + 1 + color) % 2, nx-1, 2):
+                if not mask[i, j]:
+                    psi_gs = 0.25 * (psi[i+1, j] + psi[i-1, j] + psi[i, j+1] + psi[i, j-1])
+                    change = omega * (psi_gs - psi[i, j])
+                    psi[i, j] += change
+                    largest = max(largest, abs(change))
+            row_change[i] = largest
+    return row_change.max()
+
+# Sparse LU factorization of the last direct solve and the fixed points it was built for
+lu = None
+lu_fixed = None
+
+def solve_laplace_direct(psi, fixed):
+    """
+    Solve ∇²ψ = 0 with a sparse LU factorization of the 5-point Laplacian.
+    fixed: True where psi keeps its current value (walls, inlet/outlet, obstacles)
+    """
+    global lu, lu_fixed
+    ny, nx = psi.shape
+    
+    # The matrix only depends on which points are fixed, so it is only factored when they change
+    if lu_fixed is None or not np.array_equal(fixed, lu_fixed):
+        n = nx * ny
+        fixed_flat = fixed.ravel()
+        # 5-point Laplacian on square cells (dx == dy), with the rows of fixed points
+        # replaced by identity rows so they keep their boundary value
+        laplacian = diags([1, 1, -4, 1, 1], [-nx, -1, 0, 1, nx], shape=(n, n), format='csr')
+        A = diags((~fixed_flat).astype(float)) @ laplacian + diags(fixed_flat.astype(float))
+        lu = splu(A.tocsc())
+        lu_fixed = fixed.copy()
+    
+    rhs = np.where(fixed, psi, 0.0).ravel()
+    return lu.solve(rhs).reshape(ny, nx)
+
+def solve_stream_function_with_step(step_height=0.0, U_inf=1.0, method='direct', psi0=None):
     """
     Solve for stream function with a step in the bottom wall.
     step_height: height of the step (0 = no step, positive = step up)
+    method: 'direct' (sparse LU, refactored only when the obstacle covers other grid points)
+            or 'sor' (iterative red-black SOR)
+    psi0: previous solution to start the SOR iteration from (warm start), or None to start from zero
     """
-    # Grid spacing
-    dx = 2.0 / (nx - 1)  # Domain from -1 to 1
-    dy = 2.0 / (ny - 1)  # Domain from -1 to 1
-    
-    # Create coordinate arrays
-    x = np.linspace(-1, 1, nx)
-    y = np.linspace(-1, 1, ny)
-    X, Y = np.meshgrid(x, y)
-    
-    # Initialize stream function
-    psi = np.zeros((ny, nx))
-    
-    # Create step geometry - step starts at x = 0
-    step_start_idx = nx // 2  # Middle of domain (x = 0)
+    # Initialize stream function; a nearby previous solution converges in far fewer sweeps
+    psi = np.zeros((ny, nx)) if psi0 is None else psi0.copy()
     
     # Find the indices corresponding to the step height
     step_height_clamped = np.clip(step_height, 0, 1.8)  # Limit step height
@@ -32,6 +90,14 @@ def solve_stream_function_with_step(nx, ny, step_height=0.0, U_inf=1.0):
     velocity_ratio = inlet_area / exit_area if exit_area > 0 else 1.0
     U_exit = U_inf * velocity_ratio
     
+    # Create a mask for solid regions (inside the step)
+    solid_mask = np.zeros((ny, nx), dtype=bool)
+    if step_height > 0:
+        solid_mask[:step_idx + 1, step_start_idx:] = True
+    
+    # Cells inside the step start from zero, also when warm-starting from another step height
+    psi[solid_mask] = 0.0
+    
     # Set boundary conditions for domain [-1, 1] x [-1, 1]
     # Left boundary (x = -1): free stream ψ = U_inf * y
     psi[:, 0] = U_inf * y
@@ -41,13 +107,15 @@ def solve_stream_function_with_step(nx, ny, step_height=0.0, U_inf=1.0):
     y_exit_bottom = -1 + step_height_clamped  # Bottom of exit (top of step)
     y_exit_top = 1  # Top of exit
     
-    for i in range(ny):
-        if y[i] >= y_exit_bottom:  # Only set values above the step
-            # Linear distribution from step surface to top
-            psi_exit_bottom = U_inf * y_exit_bottom
-            psi_exit_top = U_inf * y_exit_top
-            # Scale by velocity ratio to account for area change
-            psi[i, -1] = psi_exit_bottom + (psi_exit_top - psi_exit_bottom) * (y[i] - y_exit_bottom) / (y_exit_top - y_exit_bottom) * velocity_ratio
+    # Only set values above the step; the profile depends only on the geometry,
+    # so it is computed once here and reused inside the iteration
+    exit_rows = y >= y_exit_bottom
+    # Linear distribution from step surface to top
+    psi_exit_bottom = U_inf * y_exit_bottom
+    psi_exit_top = U_inf * y_exit_top
+    # Scale by velocity ratio to account for area change
+    psi_right = psi_exit_bottom + (psi_exit_top - psi_exit_bottom) * (y[exit_rows] - y_exit_bottom) / (y_exit_top - y_exit_bottom) * velocity_ratio
+    psi[exit_rows, -1] = psi_right
     
     # Bottom wall with step
     # Before step (x < 0): ψ = -U_inf
@@ -56,39 +124,34 @@ def solve_stream_function_with_step(nx, ny, step_height=0.0, U_inf=1.0):
     if step_height > 0:
         psi[step_idx, step_start_idx:] = U_inf * (-1 + step_height)
         # Vertical wall of step
-        for i in range(1, step_idx):
-            psi[i, step_start_idx] = -U_inf  # Vertical wall condition
+        psi[1:step_idx, step_start_idx] = -U_inf  # Vertical wall condition
     else:
         psi[0, step_start_idx:] = -U_inf
     
     # Top wall (y = 1): ψ = +U_inf
     psi[-1, :] = U_inf
     
-    # Create a mask for solid regions (inside the step)
-    solid_mask = np.zeros((ny, nx), dtype=bool)
-    if step_height > 0:
-        for i in range(step_idx + 1):
-            solid_mask[i, step_start_idx:] = True
+    if method == 'direct':
+        # Domain edges and the solid region keep the values set above
+        fixed = solid_mask.copy()
+        fixed[[0, -1], :] = True
+        fixed[:, [0, -1]] = True
+        psi = solve_laplace_direct(psi, fixed)
+        return psi, solid_mask
     
     # Solve Laplace equation ∇²ψ = 0 in the fluid region
+    omega = 2.0 / (1.0 + np.sin(np.pi / max(nx, ny)))  # Optimal over-relaxation for this grid
     for iteration in range(1000):
-        psi_old = psi.copy()
-        
-        # Interior points: ∇²ψ = 0
-        for i in range(1, ny-1):
-            for j in range(1, nx-1):
-                if not solid_mask[i, j]:  # Only update fluid points
-                    psi[i, j] = 0.25 * (psi[i+1, j] + psi[i-1, j] + psi[i, j+1] + psi[i, j-1])
+        # Interior points: ∇²ψ = 0 (only fluid points are updated)
+        # Red points first, then black points using the freshly updated red values;
+        # the sweep reports its largest update, so no copy of the previous iterate is kept
+        change = _sor_sweep(psi, solid_mask, omega)
         
         # Reapply boundary conditions
         psi[:, 0] = U_inf * y    # Left
         
         # Right boundary with mass conservation
-        for i in range(ny):
-            if y[i] >= y_exit_bottom:
-                psi_exit_bottom = U_inf * y_exit_bottom
-                psi_exit_top = U_inf * y_exit_top
-                psi[i, -1] = psi_exit_bottom + (psi_exit_top - psi_exit_bottom) * (y[i] - y_exit_bottom) / (y_exit_top - y_exit_bottom) * velocity_ratio
+        psi[exit_rows, -1] = psi_right
         
         psi[-1, :] = U_inf       # Top
         
@@ -97,36 +160,27 @@ def solve_stream_function_with_step(nx, ny, step_height=0.0, U_inf=1.0):
         if step_height > 0:
             psi[step_idx, step_start_idx:] = U_inf * (-1 + step_height)
             # Vertical wall
-            for i in range(1, step_idx):
-                psi[i, step_start_idx] = -U_inf
+            psi[1:step_idx, step_start_idx] = -U_inf
         else:
             psi[0, step_start_idx:] = -U_inf
         
         # Check convergence
-        if np.max(np.abs(psi - psi_old)) < 1e-6:
+        if change < 1e-6:
             break
     
-    return X, Y, psi, solid_mask
+    return psi, solid_mask
 
 def compute_laplacian(psi, dx, dy):
     """Compute the Laplacian of the stream function using finite differences"""
-    ny, nx = psi.shape
     laplacian = np.zeros_like(psi)
     
-    # Interior points
-    for i in range(1, ny-1):
-        for j in range(1, nx-1):
-            d2psi_dx2 = (psi[i, j+1] - 2*psi[i, j] + psi[i, j-1]) / dx**2
-            d2psi_dy2 = (psi[i+1, j] - 2*psi[i, j] + psi[i-1, j]) / dy**2
-            laplacian[i, j] = d2psi_dx2 + d2psi_dy2
+    # Interior points (boundary rows/columns stay zero)
+    d2psi_dx2 = (psi[1:-1, 2:] - 2*psi[1:-1, 1:-1] + psi[1:-1, :-2]) / dx**2
+    d2psi_dy2 = (psi[2:, 1:-1] - 2*psi[1:-1, 1:-1] + psi[:-2, 1:-1]) / dy**2
+    laplacian[1:-1, 1:-1] = d2psi_dx2 + d2psi_dy2
     
     return laplacian
 
-# Parameters
-nx, ny = 81, 81  # Grid size
-U_inf = 1.0      # Free stream velocity
-initial_step = 0.0  # Initial step height
-
 # Create the figure and subplots
 fig = plt.figure(figsize=(18, 10))
 gs = fig.add_gridspec(2, 3, height_ratios=[1, 0.05], hspace=0.3, wspace=0.3)
@@ -140,21 +194,49 @@ ax3 = fig.add_subplot(gs[0, 2])
 slider_ax = fig.add_subplot(gs[1, :])
 
 # Solve initial case
-X, Y, psi_initial, solid_mask_initial = solve_stream_function_with_step(nx, ny, initial_step, U_inf)
-
-# Compute grid spacing
-dx = 2.0 / (nx - 1)
-dy = 2.0 / (ny - 1)
+psi_initial, solid_mask_initial = solve_stream_function_with_step(initial_step, U_inf)
 
 # Compute initial Laplacian
 laplacian_initial = compute_laplacian(psi_initial, dx, dy)
 
+# Plot decorations that never change are set up once
+for ax in (ax1, ax2, ax3):
+    ax.set_xlabel('x')
+    ax.set_ylabel('y')
+    ax.grid(True, alpha=0.3)
+    ax.axis('equal')
+    ax.set_xlim(-1, 1)
+    ax.set_ylim(-1, 1)
+ax2.set_title('Laplacian of Stream Function (∇²ψ)')
+ax3.set_title('Velocity Field and Streamlines')
+
+# Quiver on the whole subsampled grid; arrows inside the step are masked out
+step = 4
+sub_idx = (slice(None, None, step), slice(None, None, step))
+X_sub = X[sub_idx]
+Y_sub = Y[sub_idx]
+quiver = ax3.quiver(X_sub, Y_sub, np.zeros_like(X_sub), np.zeros_like(Y_sub), alpha=0.7)
+
+# Everything that changes with the step height is animated: it is left out of normal
+# figure draws and blitted over a cached background of the static parts instead
+contour_sets = []
+dynamic_artists = []
+cb2 = None
+background = None
+
+def shade_solid(ax, solid_mask):
+    """Shade solid regions; returns the contour sets drawn (none when there is no step)"""
+    if not np.any(solid_mask):
+        return []
+    return [ax.contourf(X, Y, solid_mask.astype(float), levels=[0.5, 1.5], colors=['gray'], alpha=0.7)]
+
 # Initial plots
 def create_plots(psi, laplacian, solid_mask, step_height):
-    # Clear all axes
-    ax1.clear()
-    ax2.clear()
-    ax3.clear()
+    global cb2
+    
+    # Contour sets can't be updated in place, so the previous ones are replaced
+    for contour_set in contour_sets:
+        contour_set.remove()
     
     # Plot 1: Stream function
     # Mask solid regions
@@ -162,98 +244,87 @@ def create_plots(psi, laplacian, solid_mask, step_height):
     psi_plot[solid_mask] = np.nan
     
     contour1 = ax1.contour(X, Y, psi_plot, levels=20, colors='blue', alpha=0.8)
-    ax1.clabel(contour1, inline=True, fontsize=8)
+    labels1 = ax1.clabel(contour1, inline=True, fontsize=8)
     
     # Shade solid regions
-    if np.any(solid_mask):
-        ax1.contourf(X, Y, solid_mask.astype(float), levels=[0.5, 1.5], colors=['gray'], alpha=0.7)
+    shade1 = shade_solid(ax1, solid_mask)
     
     ax1.set_title(f'Stream Function ψ (Step Height: {step_height:.2f})')
-    ax1.set_xlabel('x')
-    ax1.set_ylabel('y')
-    ax1.grid(True, alpha=0.3)
-    ax1.axis('equal')
-    ax1.set_xlim(-1, 1)
-    ax1.set_ylim(-1, 1)
     
     # Plot 2: Laplacian
     laplacian_plot = laplacian.copy()
     laplacian_plot[solid_mask] = np.nan
     
     contour2 = ax2.contourf(X, Y, laplacian_plot, levels=20, cmap='RdBu_r')
-    cb2 = plt.colorbar(contour2, ax=ax2, label='∇²ψ')
+    if cb2 is None:
+        cb2 = plt.colorbar(contour2, ax=ax2, label='∇²ψ')
+    else:
+        # update_normal keeps the first contour set's level bands, so hand it the new ones
+        cb2.boundaries = contour2.levels
+        cb2.values = contour2.cvalues
+        cb2.update_normal(contour2)
     contour2_lines = ax2.contour(X, Y, laplacian_plot, levels=20, colors='black', alpha=0.4, linewidths=0.5)
     
     # Shade solid regions
-    if np.any(solid_mask):
-        ax2.contourf(X, Y, solid_mask.astype(float), levels=[0.5, 1.5], colors=['gray'], alpha=0.7)
-    
-    ax2.set_title('Laplacian of Stream Function (∇²ψ)')
-    ax2.set_xlabel('x')
-    ax2.set_ylabel('y')
-    ax2.grid(True, alpha=0.3)
-    ax2.axis('equal')
-    ax2.set_xlim(-1, 1)
-    ax2.set_ylim(-1, 1)
+    shade2 = shade_solid(ax2, solid_mask)
     
     # Plot 3: Velocity field
-    u = np.gradient(psi, dy, axis=0)  # ∂ψ/∂y
-    v = -np.gradient(psi, dx, axis=1)  # -∂ψ/∂x
-    
-    # Mask solid regions for velocity
-    u[solid_mask] = 0
-    v[solid_mask] = 0
-    
-    # Subsample for quiver plot
-    step = 4
-    X_sub = X[::step, ::step]
-    Y_sub = Y[::step, ::step]
-    u_sub = u[::step, ::step]
-    v_sub = v[::step, ::step]
-    solid_sub = solid_mask[::step, ::step]
+    # Subsample for quiver plot; solid points are masked out below rather than zeroed
+    u_sub = np.gradient(psi, dy, axis=0)[sub_idx]  # ∂ψ/∂y
+    v_sub = -np.gradient(psi, dx, axis=1)[sub_idx]  # -∂ψ/∂x
+    solid_sub = solid_mask[sub_idx]
     
     # Only plot arrows in fluid regions
-    X_fluid = X_sub[~solid_sub]
-    Y_fluid = Y_sub[~solid_sub]
-    u_fluid = u_sub[~solid_sub]
-    v_fluid = v_sub[~solid_sub]
-    
-    if len(X_fluid) > 0:
-        ax3.quiver(X_fluid, Y_fluid, u_fluid, v_fluid, alpha=0.7)
+    quiver.set_UVC(np.ma.masked_array(u_sub, solid_sub), np.ma.masked_array(v_sub, solid_sub))
+    quiver.scale = None  # rescale the arrow length to the new speeds, as a new quiver would
     
     contour3 = ax3.contour(X, Y, psi_plot, levels=15, colors='blue', alpha=0.5)
     
     # Shade solid regions
-    if np.any(solid_mask):
-        ax3.contourf(X, Y, solid_mask.astype(float), levels=[0.5, 1.5], colors=['gray'], alpha=0.7)
-    
-    ax3.set_title('Velocity Field and Streamlines')
-    ax3.set_xlabel('x')
-    ax3.set_ylabel('y')
-    ax3.grid(True, alpha=0.3)
-    ax3.axis('equal')
-    ax3.set_xlim(-1, 1)
-    ax3.set_ylim(-1, 1)
+    shade3 = shade_solid(ax3, solid_mask)
+    
+    contour_sets[:] = [contour1, *shade1, contour2, contour2_lines, *shade2, contour3, *shade3]
+    dynamic_artists[:] = [contour1, *labels1, *shade1, ax1.title,
+                          contour2, contour2_lines, *shade2, cb2.ax,
+                          quiver, contour3, *shade3, slider_ax]
+    for artist in dynamic_artists:
+        artist.set_animated(True)
+
+def draw_dynamic_artists():
+    """Draw the animated artists, back to front, onto the canvas"""
+    for artist in dynamic_artists:
+        fig.draw_artist(artist)
+
+def on_draw(event):
+    """After a full redraw (first show, resize) cache the static background"""
+    global background
+    background = fig.canvas.copy_from_bbox(fig.bbox)
+    draw_dynamic_artists()
+
+fig.canvas.mpl_connect('draw_event', on_draw)
 
 # Create initial plots
 create_plots(psi_initial, laplacian_initial, solid_mask_initial, initial_step)
 
-# Create slider
+# Create slider; it is blitted with the plots instead of triggering full redraws
 slider = Slider(slider_ax, 'Step Height', 0.0, 1.5, valinit=initial_step, valfmt='%.2f')
+slider.drawon = False
 
 # Update function
 def update(val):
     step_height = slider.val
     
-    # Solve with new step height
-    X_new, Y_new, psi_new, solid_mask_new = solve_stream_function_with_step(nx, ny, step_height, U_inf)
+    # Solve with new step height; the LU factorization is reused while the solid points stay the same
+    psi_new, solid_mask_new = solve_stream_function_with_step(step_height, U_inf)
     laplacian_new = compute_laplacian(psi_new, dx, dy)
     
     # Update plots
     create_plots(psi_new, laplacian_new, solid_mask_new, step_height)
     
-    # Redraw
-    fig.canvas.draw()
+    # Redraw only what changed, on top of the cached background
+    fig.canvas.restore_region(background)
+    draw_dynamic_artists()
+    fig.canvas.blit(fig.bbox)
 
 # Connect slider to update function
 slider.on_changed(update)